@@ -0,0 +1,54 @@
+"""
+Logging configuration for the SpotyFire backend.
+"""
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def resolve_log_level(value: Optional[str], default: int = logging.INFO) -> int:
+    if not value:
+        return default
+    level = logging.getLevelName(value.strip().upper())
+    if isinstance(level, int):
+        return level
+    print(f"⚠️  Unknown LOG_LEVEL '{value}', falling back to {logging.getLevelName(default)}")
+    return default
+
+
+def configure_logging():
+    """Route app.* loggers through a background queue listener with a timestamped formatter."""
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(resolve_log_level(os.getenv("LOG_LEVEL")))
+    app_logger.addHandler(QueueHandler(log_queue))
+    app_logger.propagate = False
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    app_logger = logging.getLogger("app")
+    for handler in list(app_logger.handlers):
+        if isinstance(handler, QueueHandler):
+            app_logger.removeHandler(handler)
+    app_logger.propagate = True
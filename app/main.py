@@ -29,16 +29,24 @@ from app.routes.satellite import router as satellite_router
 from app.routes.alerts import router as alerts_router
 from app.services.auth import get_current_user, NeonAuthUser
 from app.services.alert_notifier import start_alert_monitoring
+from app.services.email_service import close_smtp_pool
+from app.services.firms import close_http_session
+from app.logging_config import configure_logging, shutdown_logging
 import app.db_models
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    configure_logging()
     await init_db()
     
     asyncio.create_task(start_alert_monitoring())
     
     yield
+    
+    await close_smtp_pool()
+    await close_http_session()
+    shutdown_logging()
 
 
 app = FastAPI(
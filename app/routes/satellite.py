@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -360,7 +361,8 @@ async def generate_analysis_report(
     overlay_before_b64 = analysis.overlay_before_b64 or ""
     overlay_after_b64 = analysis.overlay_after_b64 or ""
     
-    pdf_bytes = generate_satellite_report_pdf(
+    pdf_bytes = await asyncio.to_thread(
+        generate_satellite_report_pdf,
         property_name=property_obj.name,
         analysis_data=analysis_data,
         property_data=property_data,
@@ -3,6 +3,9 @@ AI Agent Service using Groq.
 Handles chat interactions and claim assistance.
 """
 import os
+import hashlib
+from collections import OrderedDict
+import orjson
 from groq import Groq
 from dotenv import load_dotenv
 from typing import Optional
@@ -11,6 +14,15 @@ load_dotenv()
 
 client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 MODEL_NAME = "llama-3.3-70b-versatile"
+SUMMARY_MODEL_NAME = "llama-3.1-8b-instant"
+
+CONTEXT_CACHE_SIZE = 1024
+_context_message_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+HISTORY_WINDOW = 8
+SUMMARY_EVERY = 10
+SUMMARY_CACHE_SIZE = 256
+_summary_cache: "OrderedDict[bytes, str]" = OrderedDict()
 
 SYSTEM_PROMPT = """You are SpotyBot, an expert Agricultural Insurance Claims Adjuster AI assistant created by SpotyFire.
 
@@ -45,6 +57,33 @@ Tell them: "Pentru a genera un raport satelit sau descărca PDF, accesează sec
 
 If you don't have damage context provided, ask the user to first run a satellite analysis of their land."""
 
+_SEVERITY_EMOJI = {
+    'low': '🟡',
+    'medium': '🟠',
+    'high': '🔴',
+    'critical': '⚫'
+}
+
+_ALERT_TYPE_EMOJI = {
+    'fire': '🔥',
+    'flood': '💧',
+    'ndvi': '🌿',
+    'warning': '⚠️'
+}
+
+_CAPABILITIES_SECTION = """
+APPLICATION CAPABILITIES:
+
+- Satellite Analysis: Generate damage reports using Sentinel-1 SAR imagery
+- PDF Reports: Download professional reports with satellite overlays
+- Property Management: Track multiple properties and their damage history
+- NDVI Monitoring: Vegetation health tracking before and after disasters
+- Real-time Alerts: Get notified when disasters are detected near your properties
+- Proximity Analysis: See how far disasters are from your land
+- Insurance Claims: AI-assisted claim drafting and documentation
+
+Use this data to provide accurate, personalized assistance to the farmer. When the user asks about disasters near their property, use the ACTIVE DISASTER ALERTS section which includes distance calculations."""
+
 
 async def generate_report_insights(analysis_data: dict, property_data: dict) -> str:
     prompt = f"""Based on the following satellite analysis data, generate a professional, detailed insurance report insight in Romanian.
@@ -94,118 +133,140 @@ Write in formal Romanian, as this will be included in an official insurance docu
 
 
 def build_context_message(context: Optional[dict]) -> str:
-    """Build a context message from analysis data."""
+    """Build a context message from analysis data, reusing it while the context is unchanged."""
     if not context:
         return ""
     
+    try:
+        key = hashlib.blake2b(
+            orjson.dumps(context, option=orjson.OPT_SORT_KEYS),
+            digest_size=16
+        ).digest()
+    except TypeError:
+        return _build_context_message(context)
+    
+    cached = _context_message_cache.get(key)
+    if cached is not None:
+        _context_message_cache.move_to_end(key)
+        return cached
+    
+    message = _build_context_message(context)
+    _context_message_cache[key] = message
+    if len(_context_message_cache) > CONTEXT_CACHE_SIZE:
+        _context_message_cache.popitem(last=False)
+    return message
+
+
+def _build_context_message(context: dict) -> str:
     context_parts = []
+    append = context_parts.append
     
-    if context.get('properties'):
-        properties = context.get('properties', [])
-        if properties:
-            context_parts.append("\nUSER'S REGISTERED PROPERTIES:")
-            for i, prop in enumerate(properties, 1):
-                estimated_value = prop.get('estimated_value')
-                value_str = f"€{estimated_value:,.2f}" if estimated_value else "N/A"
-                context_parts.append(f"""
-Property {i}: {prop.get('name', 'Unnamed')}
-- Location: {prop.get('center_lat', 'N/A')}, {prop.get('center_lng', 'N/A')}
-- Crop Type: {prop.get('crop_type') or 'Not specified'}
-- Area: {prop.get('area_ha') or 'N/A'} hectares
+    properties = context.get('properties') or []
+    if properties:
+        append("\nUSER'S REGISTERED PROPERTIES:")
+        for i, prop in enumerate(properties, 1):
+            get = prop.get
+            name = get('name', 'Unnamed')
+            lat = get('center_lat', 'N/A')
+            lng = get('center_lng', 'N/A')
+            crop_type = get('crop_type') or 'Not specified'
+            area_ha = get('area_ha') or 'N/A'
+            estimated_value = get('estimated_value')
+            value_str = f"€{estimated_value:,.2f}" if estimated_value else "N/A"
+            risk_score = get('risk_score', 0)
+            last_analysed_at = get('last_analysed_at') or 'Never'
+            append(f"""
+Property {i}: {name}
+- Location: {lat}, {lng}
+- Crop Type: {crop_type}
+- Area: {area_ha} hectares
 - Estimated Value: {value_str}
-- Risk Score: {prop.get('risk_score', 0)}/100
-- Last Analyzed: {prop.get('last_analysed_at') or 'Never'}""")
+- Risk Score: {risk_score}/100
+- Last Analyzed: {last_analysed_at}""")
     
-    if context.get('analyses'):
-        analyses = context.get('analyses', [])
-        if analyses:
-            context_parts.append("\nRECENT SATELLITE ANALYSES:")
-            for i, analysis in enumerate(analyses, 1):
-                context_parts.append(f"""
+    analyses = context.get('analyses') or []
+    if analyses:
+        append("\nRECENT SATELLITE ANALYSES:")
+        for i, analysis in enumerate(analyses, 1):
+            get = analysis.get
+            property_name = get('property_name', 'N/A')
+            start = get('date_range_start')
+            end = get('date_range_end')
+            damage_percent = get('damage_percent', 0)
+            damaged_area_ha = get('damaged_area_ha', 0)
+            estimated_cost = get('estimated_cost', 0)
+            ndvi_before = get('ndvi_before', 'N/A')
+            ndvi_after = get('ndvi_after', 'N/A')
+            analysis_type = get('analysis_type', 'SAR')
+            created_at = get('created_at', 'N/A')
+            append(f"""
 Analysis {i}:
-- Property: {analysis.get('property_name', 'N/A')}
-- Date Range: {analysis.get('date_range_start')} to {analysis.get('date_range_end')}
-- Damage: {analysis.get('damage_percent', 0):.2f}%
-- Affected Area: {analysis.get('damaged_area_ha', 0):.2f} hectares
-- Estimated Cost: €{analysis.get('estimated_cost', 0):,.2f}
-- NDVI Before: {analysis.get('ndvi_before', 'N/A')}
-- NDVI After: {analysis.get('ndvi_after', 'N/A')}
-- Analysis Type: {analysis.get('analysis_type', 'SAR')}
-- Created: {analysis.get('created_at', 'N/A')}""")
+- Property: {property_name}
+- Date Range: {start} to {end}
+- Damage: {damage_percent:.2f}%
+- Affected Area: {damaged_area_ha:.2f} hectares
+- Estimated Cost: €{estimated_cost:,.2f}
+- NDVI Before: {ndvi_before}
+- NDVI After: {ndvi_after}
+- Analysis Type: {analysis_type}
+- Created: {created_at}""")
     
     if context.get('claim_id'):
-        context_parts.append(f"""
+        get = context.get
+        append(f"""
 CURRENT DAMAGE ANALYSIS DATA:
-- Claim ID: {context.get('claim_id', 'N/A')}
-- Location: {context.get('location', 'N/A')}
-- Crop Type: {context.get('crop_type', 'N/A')}
-- Total Farm Area: {context.get('total_area_ha', 'N/A')} hectares
-- Damaged Area: {context.get('damaged_area_ha', 'N/A')} hectares
-- Damage Percentage: {context.get('damage_percent', 'N/A')}%
-- Value per Hectare: €{context.get('value_per_ha', 'N/A')}
-- Estimated Financial Loss: €{context.get('financial_loss', 0):,.2f}
-- Disaster Type: {context.get('disaster_type', 'N/A')}
-- Analysis Date: {context.get('analysis_date', 'N/A')}""")
+- Claim ID: {get('claim_id', 'N/A')}
+- Location: {get('location', 'N/A')}
+- Crop Type: {get('crop_type', 'N/A')}
+- Total Farm Area: {get('total_area_ha', 'N/A')} hectares
+- Damaged Area: {get('damaged_area_ha', 'N/A')} hectares
+- Damage Percentage: {get('damage_percent', 'N/A')}%
+- Value per Hectare: €{get('value_per_ha', 'N/A')}
+- Estimated Financial Loss: €{get('financial_loss', 0):,.2f}
+- Disaster Type: {get('disaster_type', 'N/A')}
+- Analysis Date: {get('analysis_date', 'N/A')}""")
     
-    if context.get('report_stats'):
-        stats = context.get('report_stats', {})
-        context_parts.append(f"""
+    stats = context.get('report_stats')
+    if stats:
+        get = stats.get
+        append(f"""
 REPORT STATISTICS:
-- Total Reports Generated: {stats.get('total_reports', 0)}
-- Reports This Month: {stats.get('reports_this_month', 0)}
-- Total Damage Detected: {stats.get('total_damage_ha', 0):.2f} hectares
-- Total Estimated Loss: €{stats.get('total_loss', 0):,.2f}
-- Average Damage: {stats.get('avg_damage_percent', 0):.2f}%""")
+- Total Reports Generated: {get('total_reports', 0)}
+- Reports This Month: {get('reports_this_month', 0)}
+- Total Damage Detected: {get('total_damage_ha', 0):.2f} hectares
+- Total Estimated Loss: €{get('total_loss', 0):,.2f}
+- Average Damage: {get('avg_damage_percent', 0):.2f}%""")
     
-    if context.get('alerts'):
-        alerts = context.get('alerts', [])
-        if alerts:
-            context_parts.append("\nACTIVE DISASTER ALERTS:")
-            for i, alert in enumerate(alerts, 1):
-                distance_info = ""
-                if alert.get('distance_km') is not None and alert.get('nearest_property'):
-                    distance_info = f" ({alert['distance_km']:.1f}km from {alert['nearest_property']})"
-                
-                severity_emoji = {
-                    'low': '🟡',
-                    'medium': '🟠',
-                    'high': '🔴',
-                    'critical': '⚫'
-                }.get(alert.get('severity', 'low'), '')
-                
-                type_emoji = {
-                    'fire': '🔥',
-                    'flood': '💧',
-                    'ndvi': '🌿',
-                    'warning': '⚠️'
-                }.get(alert.get('type', 'warning'), '')
-                
-                context_parts.append(f"""
-Alert {i}: {type_emoji} {alert.get('message')}{distance_info}
-- Type: {alert.get('type', 'N/A').upper()}
-- Severity: {severity_emoji} {alert.get('severity', 'N/A').upper()}
-- Location: {alert.get('sector', 'N/A')}
-- Coordinates: {alert.get('lat', 'N/A')}, {alert.get('lng', 'N/A')}
-- Impact Radius: {alert.get('radius_km', 0):.1f}km
-- Created: {alert.get('created_at', 'N/A')}""")
+    alerts = context.get('alerts') or []
+    if alerts:
+        append("\nACTIVE DISASTER ALERTS:")
+        for i, alert in enumerate(alerts, 1):
+            get = alert.get
+            distance_km = get('distance_km')
+            nearest_property = get('nearest_property')
+            distance_info = ""
+            if distance_km is not None and nearest_property:
+                distance_info = f" ({distance_km:.1f}km from {nearest_property})"
+            
+            severity = get('severity', 'low')
+            alert_type = get('type', 'warning')
+            severity_emoji = _SEVERITY_EMOJI.get(severity, '')
+            type_emoji = _ALERT_TYPE_EMOJI.get(alert_type, '')
+            
+            append(f"""
+Alert {i}: {type_emoji} {get('message')}{distance_info}
+- Type: {get('type', 'N/A').upper()}
+- Severity: {severity_emoji} {get('severity', 'N/A').upper()}
+- Location: {get('sector', 'N/A')}
+- Coordinates: {get('lat', 'N/A')}, {get('lng', 'N/A')}
+- Impact Radius: {get('radius_km', 0):.1f}km
+- Created: {get('created_at', 'N/A')}""")
     
     if context_parts:
-        context_parts.append("\nAPPLICATION CAPABILITIES:")
-        context_parts.append("""
-- Satellite Analysis: Generate damage reports using Sentinel-1 SAR imagery
-- PDF Reports: Download professional reports with satellite overlays
-- Property Management: Track multiple properties and their damage history
-- NDVI Monitoring: Vegetation health tracking before and after disasters
-- Real-time Alerts: Get notified when disasters are detected near your properties
-- Proximity Analysis: See how far disasters are from your land
-- Insurance Claims: AI-assisted claim drafting and documentation
-
-Use this data to provide accurate, personalized assistance to the farmer. When the user asks about disasters near their property, use the ACTIVE DISASTER ALERTS section which includes distance calculations.""")
+        append(_CAPABILITIES_SECTION)
         return "\n".join(context_parts)
     
     return ""
-    
-    return ""
 
 
 def build_conversation_history(history: Optional[list]) -> list:
@@ -223,6 +284,47 @@ def build_conversation_history(history: Optional[list]) -> list:
     return formatted
 
 
+def summarize_conversation(turns: list) -> Optional[str]:
+    """Compress older conversation turns into a short summary, reused until the next refresh."""
+    if not turns:
+        return None
+    
+    try:
+        key = hashlib.blake2b(orjson.dumps(turns), digest_size=16).digest()
+    except TypeError:
+        return None
+    
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        _summary_cache.move_to_end(key)
+        return cached
+    
+    transcript = "\n".join(
+        f"{'Assistant' if msg.get('role') == 'model' else 'User'}: {msg.get('content', '')}"
+        for msg in turns
+    )
+    
+    try:
+        response = client.chat.completions.create(
+            model=SUMMARY_MODEL_NAME,
+            messages=[
+                {"role": "system", "content": "Summarize the conversation between a farmer and an insurance claims assistant. Keep facts, figures, property names, dates and open requests. Answer in at most 150 words, in the language of the conversation."},
+                {"role": "user", "content": transcript}
+            ],
+            temperature=0.2,
+            max_tokens=300
+        )
+        summary = response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Error summarizing conversation: {e}")
+        return None
+    
+    _summary_cache[key] = summary
+    if len(_summary_cache) > SUMMARY_CACHE_SIZE:
+        _summary_cache.popitem(last=False)
+    return summary
+
+
 async def generate_ai_suggested_actions(
     message: str,
     response_text: str,
@@ -330,7 +432,16 @@ async def chat_with_agent(
         messages = [{"role": "system", "content": SYSTEM_PROMPT + build_context_message(context)}]
         
         if conversation_history:
-            for msg in conversation_history:
+            recent_history = conversation_history[-HISTORY_WINDOW:]
+            older_count = len(conversation_history) - HISTORY_WINDOW
+            if older_count >= SUMMARY_EVERY:
+                summarized_count = older_count // SUMMARY_EVERY * SUMMARY_EVERY
+                summary = summarize_conversation(conversation_history[:summarized_count])
+                if summary:
+                    messages.append({"role": "system", "content": f"SESSION SUMMARY:\n{summary}"})
+                    recent_history = conversation_history[summarized_count:]
+            
+            for msg in recent_history:
                 role = "assistant" if msg.get("role") == "model" else "user"
                 messages.append({
                     "role": role,
@@ -3,7 +3,7 @@ Alert Notification Service
 Periodically checks for alerts near user properties and sends email notifications
 """
 import asyncio
-from datetime import datetime, timedelta
+import logging
 from typing import List, Dict
 import math
 import os
@@ -13,11 +13,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db_session
 from app.db_models import Alert, Property
-from app.services.email_service import send_alert_email
+from app.services.email_service import send_alert_email, EMAIL_SENT, EMAIL_SKIPPED
 
 STACK_PROJECT_ID = os.getenv("STACK_PROJECT_ID")
 STACK_SECRET_KEY = os.getenv("STACK_SECRET_SERVER_KEY")
 
+logger = logging.getLogger(__name__)
+
 
 async def get_user_email_from_stack(user_id: str) -> tuple[str, str]:
     """Fetch user email and name from Stack Auth API"""
@@ -39,10 +41,10 @@ async def get_user_email_from_stack(user_id: str) -> tuple[str, str]:
                 return email or f"user-{user_id[:8]}@example.com", name
             else:
                 error_text = response.text
-                print(f"⚠️  Stack Auth API returned {response.status_code} for user {user_id[:8]}: {error_text}")
+                logger.warning("⚠️  Stack Auth API returned %s for user %s: %s", response.status_code, user_id[:8], error_text)
                 return f"user-{user_id[:8]}@example.com", f"User {user_id[:8]}"
     except Exception as e:
-        print(f"⚠️  Failed to fetch user data from Stack Auth API: {e}")
+        logger.warning("⚠️  Failed to fetch user data from Stack Auth API: %s", e)
         return f"user-{user_id[:8]}@example.com", f"User {user_id[:8]}"
 
 
@@ -62,12 +64,22 @@ def calculate_distance_km(lat1: float, lng1: float, lat2: float, lng2: float) ->
 
 async def check_alerts_for_users():
     """Check all active alerts against all user properties and send notifications"""
-    print(f"🔔 [{datetime.now()}] Starting alert notification check...")
+    logger.info("🔔 Starting alert notification check...")
     
     async for db in get_db_session():
         try:
             result = await db.execute(
-                select(Alert).where(
+                select(
+                    Alert.id,
+                    Alert.type,
+                    Alert.severity,
+                    Alert.message,
+                    Alert.sector,
+                    Alert.lat,
+                    Alert.lng,
+                    Alert.radius_km,
+                    Alert.created_at
+                ).where(
                     and_(
                         Alert.is_active == 1,
                         Alert.lat.isnot(None),
@@ -75,25 +87,31 @@ async def check_alerts_for_users():
                     )
                 )
             )
-            active_alerts = result.scalars().all()
+            active_alerts = result.all()
             
             if not active_alerts:
-                print("✅ No active alerts found")
+                logger.info("✅ No active alerts found")
                 return
             
-            print(f"📡 Found {len(active_alerts)} active alerts")
+            logger.debug("📡 Found %d active alerts", len(active_alerts))
             
             properties_result = await db.execute(
-                select(Property).where(
+                select(
+                    Property.id,
+                    Property.user_id,
+                    Property.name,
+                    Property.center_lat,
+                    Property.center_lng
+                ).where(
                     and_(
                         Property.center_lat.isnot(None),
                         Property.center_lng.isnot(None)
                     )
                 )
             )
-            properties = properties_result.scalars().all()
+            properties = properties_result.all()
             
-            print(f"🏡 Checking {len(properties)} properties")
+            logger.debug("🏡 Checking %d properties", len(properties))
             
             user_alerts_map: Dict[str, List[Dict]] = {}
             
@@ -124,24 +142,37 @@ async def check_alerts_for_users():
                         user_alerts_map[user_id] = []
                     user_alerts_map[user_id].extend(nearby_alerts)
             
-            print(f"👥 Found {len(user_alerts_map)} users with nearby alerts")
+            logger.debug("👥 Found %d users with nearby alerts", len(user_alerts_map))
             
+            sent = skipped = failed = 0
             for user_id, alert_data in user_alerts_map.items():
                 try:
                     user_email, user_name = await get_user_email_from_stack(user_id)
                     
                     if user_email and not user_email.endswith("@example.com"):
-                        await send_alert_email(user_email, user_name, alert_data)
-                        print(f"✉️  Sent alert email to {user_email} ({len(alert_data)} alerts)")
+                        status = await send_alert_email(user_email, user_name, alert_data)
+                        if status == EMAIL_SENT:
+                            sent += 1
+                            logger.debug("✉️  Sent alert email to user %s (%d alerts)", user_id[:8], len(alert_data))
+                        elif status == EMAIL_SKIPPED:
+                            skipped += 1
+                        else:
+                            failed += 1
+                            logger.warning("❌ Failed to send email to user %s", user_id[:8])
                     else:
-                        print(f"⚠️  Skipped user {user_id[:8]} - no valid email")
+                        skipped += 1
+                        logger.debug("⚠️  Skipped user %s - no valid email", user_id[:8])
                 except Exception as e:
-                    print(f"❌ Failed to send email to user {user_id[:8]}: {e}")
+                    failed += 1
+                    logger.warning("❌ Failed to send email to user %s: %s", user_id[:8], e)
             
-            print(f"✅ Alert notification check completed")
+            logger.info(
+                "✅ Alert notification check completed: %d alerts, %d properties, %d users, %d sent, %d skipped, %d failed",
+                len(active_alerts), len(properties), len(user_alerts_map), sent, skipped, failed
+            )
             
         except Exception as e:
-            print(f"❌ Error during alert check: {e}")
+            logger.error("❌ Error during alert check: %s", e)
         finally:
             await db.close()
 
@@ -150,12 +181,12 @@ async def start_alert_monitoring():
     """Start the periodic alert monitoring service"""
     interval_minutes = int(os.getenv("ALERT_CHECK_INTERVAL_MINUTES", "10"))
     
-    print(f"🚀 Starting Alert Notification Service (checking every {interval_minutes} minutes)")
+    logger.info("🚀 Starting Alert Notification Service (checking every %d minutes)", interval_minutes)
     
     while True:
         try:
             await check_alerts_for_users()
         except Exception as e:
-            print(f"❌ Error in alert monitoring loop: {e}")
+            logger.error("❌ Error in alert monitoring loop: %s", e)
         
         await asyncio.sleep(interval_minutes * 60)
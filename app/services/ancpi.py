@@ -4,6 +4,9 @@ In production, this would connect to the real ANCPI API with authorized credenti
 For MVP, we use predefined geometries.
 """
 import asyncio
+import math
+import os
+import zlib
 from typing import Optional
 from pydantic import BaseModel
 
@@ -94,21 +97,39 @@ PREDEFINED_GEOMETRIES = [
     }
 ]
 
+DEFAULT_LOOKUP_DELAY_SECONDS = 2.5
+
+
+def resolve_lookup_delay(value: Optional[str], default: float = DEFAULT_LOOKUP_DELAY_SECONDS) -> float:
+    if not value:
+        return default
+    try:
+        delay = float(value)
+    except ValueError:
+        delay = math.nan
+    if math.isfinite(delay):
+        return delay
+    print(f"⚠️  Invalid ANCPI_LOOKUP_DELAY_SECONDS '{value}', falling back to {default}")
+    return default
+
+
+LOOKUP_DELAY_SECONDS = resolve_lookup_delay(os.getenv("ANCPI_LOOKUP_DELAY_SECONDS"))
+
+_TEMPLATES = [CadastralData(**g) for g in PREDEFINED_GEOMETRIES]
+
 
 async def fetch_cadastral_data(numar_cadastral: str) -> Optional[CadastralData]:
     """
     Fetch cadastral data from ANCPI.
     In MVP mode, returns predefined geometry based on the input number.
     """
-    await asyncio.sleep(2.5)
+    if LOOKUP_DELAY_SECONDS > 0:
+        await asyncio.sleep(LOOKUP_DELAY_SECONDS)
     
     try:
         num = int(numar_cadastral.replace("-", "").replace(" ", ""))
-        index = num % len(PREDEFINED_GEOMETRIES)
+        index = num % len(_TEMPLATES)
     except ValueError:
-        index = hash(numar_cadastral) % len(PREDEFINED_GEOMETRIES)
-    
-    geometry_data = PREDEFINED_GEOMETRIES[index].copy()
-    geometry_data["numar_cadastral"] = numar_cadastral
+        index = zlib.crc32(numar_cadastral.encode()) % len(_TEMPLATES)
     
-    return CadastralData(**geometry_data)
+    return _TEMPLATES[index].model_copy(update={"numar_cadastral": numar_cadastral})
@@ -6,10 +6,10 @@ import os
 from typing import Optional
 
 import httpx
+import msgspec
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from pydantic import BaseModel
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
@@ -25,13 +25,13 @@ security = HTTPBearer(auto_error=False)
 _jwks_cache = {}
 
 
-class TokenUser(BaseModel):
+class TokenUser(msgspec.Struct):
     id: str
     email: Optional[str] = None
     name: Optional[str] = None
 
 
-class NeonAuthUser(BaseModel):
+class NeonAuthUser(msgspec.Struct):
     id: str
     email: Optional[str] = None
     name: Optional[str] = None
@@ -80,8 +80,12 @@ async def verify_stack_auth_token(token: str) -> TokenUser:
             options={"verify_aud": False},
         )
         
+        user_id = payload.get("sub")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Invalid token subject")
+        
         return TokenUser(
-            id=payload.get("sub"),
+            id=user_id,
             email=payload.get("email"),
             name=payload.get("name"),
         )
@@ -2,148 +2,194 @@
 Email Service for sending alert notifications
 """
 import os
-import smtplib
+import time
+import asyncio
+import logging
+import aiosmtplib
+from contextlib import asynccontextmanager
+from jinja2 import Environment, FileSystemLoader
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import List, Dict
 from datetime import datetime
 
 
+logger = logging.getLogger(__name__)
+
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USERNAME)
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+EMAIL_SENT = "sent"
+EMAIL_SKIPPED = "skipped"
+EMAIL_FAILED = "failed"
+
+EMAIL_SENDING_ENABLED = os.getenv("EMAIL_SENDING_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on")
+
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP sessions open so consecutive sends skip the TLS handshake and login."""
+
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        username: str,
+        password: str,
+        size: int = 4,
+        max_messages_per_conn: int = 100,
+        idle_timeout_seconds: float = 60.0,
+        timeout_seconds: float = 30.0,
+    ) -> None:
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.max_messages_per_conn = max_messages_per_conn
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.timeout_seconds = timeout_seconds
+        self._idle: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self._semaphore = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=self.server,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=True,
+            timeout=self.timeout_seconds,
+        )
+        await client.connect()
+        return client
+
+    @staticmethod
+    async def _close(client: aiosmtplib.SMTP) -> None:
+        try:
+            await client.quit()
+        except Exception:
+            client.close()
+
+    async def _checkout(self) -> list:
+        now = time.monotonic()
+        while not self._idle.empty():
+            entry = self._idle.get_nowait()
+            client, _, last_used = entry
+            if now - last_used > self.idle_timeout_seconds:
+                await self._close(client)
+                continue
+            try:
+                await client.noop()
+                return entry
+            except (aiosmtplib.SMTPException, OSError):
+                client.close()
+        return [await self._connect(), 0, now]
+
+    async def _release(self, entry: list) -> None:
+        client, sent, _ = entry
+        if sent >= self.max_messages_per_conn or self._idle.full():
+            await self._close(client)
+            return
+        entry[2] = time.monotonic()
+        self._idle.put_nowait(entry)
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self._semaphore:
+            entry = await self._checkout()
+            try:
+                yield entry[0]
+            except (aiosmtplib.SMTPServerDisconnected, OSError):
+                entry[0].close()
+                raise
+            except Exception:
+                await self._release(entry)
+                raise
+            except BaseException:
+                entry[0].close()
+                raise
+            entry[1] += 1
+            await self._release(entry)
+
+    async def close_all(self) -> None:
+        while not self._idle.empty():
+            client, _, _ = self._idle.get_nowait()
+            await self._close(client)
+
+
+_smtp_pool = SMTPConnectionPool(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD)
+
+
+async def close_smtp_pool():
+    await _smtp_pool.close_all()
+
+
+_ALERT_EMOJIS = {
+    'FIRE': '🔥',
+    'FLOOD': '💧',
+    'NDVI': '🌿',
+    'WARNING': '⚠️'
+}
+
+_SEVERITY_COLORS = {
+    'LOW': '#FCD34D',
+    'MEDIUM': '#FB923C',
+    'HIGH': '#EF4444',
+    'CRITICAL': '#991B1B'
+}
 
 
 def get_alert_emoji(alert_type: str) -> str:
-    emojis = {
-        'FIRE': '🔥',
-        'FLOOD': '💧',
-        'NDVI': '🌿',
-        'WARNING': '⚠️'
-    }
-    return emojis.get(alert_type.upper(), '⚠️')
+    emoji = _ALERT_EMOJIS.get(alert_type)
+    if emoji is None:
+        emoji = _ALERT_EMOJIS.get(alert_type.upper(), '⚠️')
+    return emoji
 
 
 def get_severity_color(severity: str) -> str:
-    colors = {
-        'LOW': '#FCD34D',
-        'MEDIUM': '#FB923C',
-        'HIGH': '#EF4444',
-        'CRITICAL': '#991B1B'
-    }
-    return colors.get(severity.upper(), '#FB923C')
+    color = _SEVERITY_COLORS.get(severity)
+    if color is None:
+        color = _SEVERITY_COLORS.get(severity.upper(), '#FB923C')
+    return color
 
 
-async def send_alert_email(to_email: str, user_name: str, alert_data: List[Dict]):
-    """Send email notification about nearby alerts"""
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
+
+_template_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True
+)
+_template_env.filters['alert_emoji'] = get_alert_emoji
+_template_env.filters['severity_color'] = get_severity_color
+_alert_template = _template_env.get_template('alert_email.html')
+
+
+async def send_alert_email(to_email: str, user_name: str, alert_data: List[Dict]) -> str:
+    """Send email notification about nearby alerts and return EMAIL_SENT, EMAIL_SKIPPED or EMAIL_FAILED"""
     
     if not SMTP_USERNAME or not SMTP_PASSWORD:
-        print("⚠️  Email credentials not configured, skipping email send")
-        return
+        logger.debug("⚠️  Email credentials not configured, skipping email send")
+        return EMAIL_SKIPPED
     
-    subject = f"🚨 Alertă SpotyFire: {len(alert_data)} pericol(e) detectat(e) lângă proprietățile tale"
+    if not EMAIL_SENDING_ENABLED:
+        logger.debug("📭 Email sending disabled (EMAIL_SENDING_ENABLED is off), skipping email send")
+        return EMAIL_SKIPPED
     
-    alert_html_rows = []
-    for item in alert_data[:10]:
-        alert = item['alert']
-        prop = item['property']
-        distance = item['distance_km']
-        is_within = item['is_within_radius']
-        
-        emoji = get_alert_emoji(alert.type.value)
-        severity_color = get_severity_color(alert.severity.value)
-        status = "🔴 ÎN ZONA DE RISC" if is_within else "⚠️ PROXIMITATE"
-        
-        alert_html_rows.append(f"""
-        <tr style="border-bottom: 1px solid #e5e7eb;">
-            <td style="padding: 16px; background-color: #f9fafb;">
-                <div style="display: flex; align-items: center; gap: 8px; margin-bottom: 8px;">
-                    <span style="font-size: 24px;">{emoji}</span>
-                    <strong style="color: #1f2937; font-size: 16px;">{alert.message}</strong>
-                </div>
-                <div style="margin-bottom: 8px;">
-                    <span style="background-color: {severity_color}; color: white; padding: 4px 12px; border-radius: 4px; font-size: 12px; font-weight: bold;">
-                        {alert.severity.value}
-                    </span>
-                    <span style="margin-left: 8px; color: #6b7280; font-size: 14px;">
-                        {status}
-                    </span>
-                </div>
-                <div style="color: #4b5563; font-size: 14px; line-height: 1.6;">
-                    <div>📍 <strong>Locație:</strong> {alert.sector}</div>
-                    <div>🏡 <strong>Proprietate afectată:</strong> {prop.name}</div>
-                    <div>📏 <strong>Distanță:</strong> {distance} km de proprietatea ta</div>
-                    <div>⚠️ <strong>Rază impact:</strong> {alert.radius_km or 0} km</div>
-                    <div>🕒 <strong>Detectat:</strong> {alert.created_at.strftime('%d.%m.%Y %H:%M')}</div>
-                </div>
-            </td>
-        </tr>
-        """)
+    subject = f"🚨 Alertă SpotyFire: {len(alert_data)} pericol(e) detectat(e) lângă proprietățile tale"
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: Arial, sans-serif; background-color: #f3f4f6;">
-        <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-            
-            <div style="background: linear-gradient(135deg, #059669 0%, #047857 100%); padding: 32px; text-align: center;">
-                <h1 style="color: white; margin: 0; font-size: 28px; font-weight: bold;">
-                    🚨 Alertă SpotyFire
-                </h1>
-                <p style="color: #d1fae5; margin: 8px 0 0 0; font-size: 16px;">
-                    Sistem de Monitorizare Satelitară
-                </p>
-            </div>
-            
-            <div style="padding: 32px; background-color: white;">
-                <p style="color: #1f2937; font-size: 16px; margin: 0 0 16px 0;">
-                    Bună <strong>{user_name}</strong>,
-                </p>
-                <p style="color: #4b5563; font-size: 14px; line-height: 1.6; margin: 0 0 24px 0;">
-                    Sistemul nostru de monitorizare satelitară a detectat <strong>{len(alert_data)} pericol(e)</strong> 
-                    în apropierea proprietăților tale. Te rugăm să verifici detaliile mai jos și să iei măsurile necesare.
-                </p>
-                
-                <div style="background-color: #fef3c7; border-left: 4px solid #f59e0b; padding: 16px; margin-bottom: 24px; border-radius: 4px;">
-                    <p style="color: #92400e; margin: 0; font-size: 14px; font-weight: bold;">
-                        ⚠️ Acțiune recomandată
-                    </p>
-                    <p style="color: #92400e; margin: 8px 0 0 0; font-size: 13px;">
-                        Verifică starea terenurilor tale și consideră măsuri preventive dacă pericolul se apropie.
-                    </p>
-                </div>
-                
-                <table style="width: 100%; border-collapse: collapse; margin-bottom: 24px;">
-                    {''.join(alert_html_rows)}
-                </table>
-                
-                <div style="text-align: center; margin-top: 32px;">
-                    <a href="{os.getenv('FRONTEND_URL', 'http://localhost:3000')}/dashboard/alerte" 
-                       style="display: inline-block; background-color: #059669; color: white; padding: 14px 32px; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px;">
-                        Vezi Toate Alertele
-                    </a>
-                </div>
-            </div>
-            
-            <div style="background-color: #f9fafb; padding: 24px; text-align: center; border-top: 1px solid #e5e7eb;">
-                <p style="color: #6b7280; margin: 0; font-size: 13px;">
-                    Acest email a fost trimis automat de <strong>SpotyFire</strong><br>
-                    Sistem de monitorizare satelitară pentru protecția culturilor agricole
-                </p>
-                <p style="color: #9ca3af; margin: 12px 0 0 0; font-size: 12px;">
-                    © {datetime.now().year} SpotyFire. Toate drepturile rezervate.
-                </p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    html_content = _alert_template.render(
+        user_name=user_name,
+        alert_count=len(alert_data),
+        alerts=alert_data[:10],
+        frontend_url=FRONTEND_URL,
+        year=datetime.now().year
+    )
     
     msg = MIMEMultipart('alternative')
     msg['Subject'] = subject
@@ -154,12 +200,10 @@ async def send_alert_email(to_email: str, user_name: str, alert_data: List[Dict]
     msg.attach(html_part)
     
     try:
-        # server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        # server.starttls()
-        # server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        # server.send_message(msg)
-        # server.quit()
-        print(f"✅ Email sent successfully to {to_email}")
+        async with _smtp_pool.acquire() as client:
+            await client.send_message(msg)
+        logger.debug("✅ Email sent successfully")
+        return EMAIL_SENT
     except Exception as e:
-        print(f"❌ Failed to send email: {e}")
-        raise
+        logger.warning("❌ Failed to send email: %s", e)
+        return EMAIL_FAILED
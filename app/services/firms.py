@@ -1,8 +1,48 @@
+import csv
 import datetime as dt
 import io
+import threading
 from typing import Sequence, Optional, List, Dict
-import pandas as pd
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import LRUCache, TTLCache
+
+MOCK_FIRES = [
+    {"latitude": 45.435, "longitude": 27.722, "confidence": "high", "bright_ti4": 320.5},
+    {"latitude": 45.441, "longitude": 27.735, "confidence": "nominal", "bright_ti4": 315.2}
+]
+
+FIRES_CACHE_TTL_SECONDS = 300
+
+_fires_cache: TTLCache = TTLCache(maxsize=512, ttl=FIRES_CACHE_TTL_SECONDS)
+_fires_validators: LRUCache = LRUCache(maxsize=512)
+_fires_cache_lock = threading.Lock()
+
+_http_session: Optional[aiohttp.ClientSession] = None
+
+_requests_session = requests.Session()
+_requests_session.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession()
+    return _http_session
+
+
+async def close_http_session():
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
 
 class FIRMSClient:
     def __init__(
@@ -17,23 +57,14 @@ class FIRMSClient:
         self.day_range = max(1, min(int(day_range), 10))
         self.timeout_seconds = timeout_seconds
 
-    def _empty_frame(self) -> pd.DataFrame:
-        return pd.DataFrame(
-            columns=["latitude", "longitude", "confidence", "bright_ti4"]
-        )
+    def _empty_frame(self) -> List[Dict]:
+        return []
 
-    def get_active_fires(
+    def _build_request(
         self,
         bbox: Sequence[float],
         end_date: Optional[dt.date] = None,
-    ) -> pd.DataFrame:
-        if not self.api_key:
-            print("FIRMSClient: missing API key, returning mock data.")
-            return pd.DataFrame([
-                {"latitude": 45.435, "longitude": 27.722, "confidence": "high", "bright_ti4": 320.5},
-                {"latitude": 45.441, "longitude": 27.735, "confidence": "nominal", "bright_ti4": 315.2}
-            ])
-
+    ) -> tuple:
         if len(bbox) != 4:
             raise ValueError(f"bbox must be [west, south, east, north], got: {bbox}")
         
@@ -54,34 +85,134 @@ class FIRMSClient:
             f"{self.api_key}/{self.source}/{area_str}/{self.day_range}/"
             f"{start_date.strftime('%Y-%m-%d')}"
         )
+        cache_key = (
+            self.source,
+            self.day_range,
+            round(west, 3),
+            round(south, 3),
+            round(east, 3),
+            round(north, 3),
+            str(end_date_obj),
+        )
+        return url, cache_key
+
+    def _copy_rows(self, rows: List[Dict]) -> List[Dict]:
+        return [dict(row) for row in rows]
+
+    def _cached(self, cache_key: tuple) -> Optional[List[Dict]]:
+        with _fires_cache_lock:
+            rows = _fires_cache.get(cache_key)
+        return self._copy_rows(rows) if rows is not None else None
+
+    def _conditional_headers(self, cache_key: tuple) -> Dict[str, str]:
+        with _fires_cache_lock:
+            validator = _fires_validators.get(cache_key)
+        if not validator:
+            return {}
+        headers = {}
+        if validator["etag"]:
+            headers["If-None-Match"] = validator["etag"]
+        if validator["last_modified"]:
+            headers["If-Modified-Since"] = validator["last_modified"]
+        return headers
+
+    def _store(self, cache_key: tuple, rows: List[Dict], headers) -> List[Dict]:
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        with _fires_cache_lock:
+            _fires_cache[cache_key] = rows
+            if etag or last_modified:
+                _fires_validators[cache_key] = {"etag": etag, "last_modified": last_modified, "rows": rows}
+        return self._copy_rows(rows)
+
+    def _revalidated(self, cache_key: tuple) -> Optional[List[Dict]]:
+        with _fires_cache_lock:
+            validator = _fires_validators.get(cache_key)
+            if validator is None:
+                return None
+            rows = validator["rows"]
+            _fires_cache[cache_key] = rows
+        return self._copy_rows(rows)
+
+    def get_active_fires(
+        self,
+        bbox: Sequence[float],
+        end_date: Optional[dt.date] = None,
+    ) -> List[Dict]:
+        if not self.api_key:
+            print("FIRMSClient: missing API key, returning mock data.")
+            return [dict(fire) for fire in MOCK_FIRES]
+
+        url, cache_key = self._build_request(bbox, end_date)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
 
         try:
-            resp = requests.get(url, timeout=self.timeout_seconds)
+            resp = _requests_session.get(url, headers=self._conditional_headers(cache_key), timeout=self.timeout_seconds)
+            if resp.status_code == 304:
+                revalidated = self._revalidated(cache_key)
+                if revalidated is not None:
+                    return revalidated
             resp.raise_for_status()
             
-            df = pd.read_csv(io.StringIO(resp.text))
-            
-            if df.empty:
-                return self._empty_frame()
-            
-            required = ["latitude", "longitude"]
-            for col in required:
-                if col not in df.columns:
-                    return self._empty_frame()
-            
-            if "confidence" not in df.columns:
-                df["confidence"] = "unknown"
-            if "bright_ti4" not in df.columns:
-                df["bright_ti4"] = 300.0
+            return self._store(cache_key, self._parse_csv(resp.text), resp.headers)
+
+        except Exception as e:
+            print(f"FIRMS API error: {e}, returning mock data")
+            return [dict(fire) for fire in MOCK_FIRES]
+
+    async def get_active_fires_async(
+        self,
+        bbox: Sequence[float],
+        end_date: Optional[dt.date] = None,
+    ) -> List[Dict]:
+        if not self.api_key:
+            print("FIRMSClient: missing API key, returning mock data.")
+            return [dict(fire) for fire in MOCK_FIRES]
+
+        url, cache_key = self._build_request(bbox, end_date)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
 
-            return df[["latitude", "longitude", "confidence", "bright_ti4"]]
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
+            headers = self._conditional_headers(cache_key)
+            async with get_http_session().get(url, headers=headers, timeout=timeout) as resp:
+                if resp.status == 304:
+                    revalidated = self._revalidated(cache_key)
+                    if revalidated is not None:
+                        return revalidated
+                resp.raise_for_status()
+                text = await resp.text()
+                response_headers = resp.headers
+            
+            return self._store(cache_key, self._parse_csv(text), response_headers)
 
         except Exception as e:
             print(f"FIRMS API error: {e}, returning mock data")
-            return pd.DataFrame([
-                {"latitude": 45.435, "longitude": 27.722, "confidence": "high", "bright_ti4": 320.5},
-                {"latitude": 45.441, "longitude": 27.735, "confidence": "nominal", "bright_ti4": 315.2}
-            ])
+            return [dict(fire) for fire in MOCK_FIRES]
+
+    def _parse_csv(self, text: str) -> List[Dict]:
+        reader = csv.DictReader(io.StringIO(text))
+        columns = reader.fieldnames or []
+        
+        if "latitude" not in columns or "longitude" not in columns:
+            return self._empty_frame()
+        
+        has_confidence = "confidence" in columns
+        has_brightness = "bright_ti4" in columns
+        
+        return [
+            {
+                "latitude": float(row["latitude"]),
+                "longitude": float(row["longitude"]),
+                "confidence": row["confidence"] if has_confidence else "unknown",
+                "bright_ti4": float(row["bright_ti4"]) if has_brightness else 300.0
+            }
+            for row in reader
+        ]
 
 async def get_fire_data(bbox: List[float], end_date: str, api_key: str = "") -> List[Dict]:
     client = FIRMSClient(api_key=api_key)
@@ -91,15 +222,14 @@ async def get_fire_data(bbox: List[float], end_date: str, api_key: str = "") ->
     except:
         end_date_obj = dt.date.today()
     
-    df = client.get_active_fires(bbox, end_date_obj)
-    
-    fire_points = []
-    for _, row in df.iterrows():
-        fire_points.append({
-            "lat": float(row["latitude"]),
-            "lon": float(row["longitude"]),
-            "confidence": str(row["confidence"]),
-            "brightness": float(row["bright_ti4"])
-        })
+    rows = await client.get_active_fires_async(bbox, end_date_obj)
     
-    return fire_points
+    return [
+        {
+            "lat": row["latitude"],
+            "lon": row["longitude"],
+            "confidence": row["confidence"],
+            "brightness": row["bright_ti4"]
+        }
+        for row in rows
+    ]
@@ -1,55 +1,206 @@
-import ee
 import os
-from google.oauth2 import service_account
-from typing import Dict, Optional
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional, Tuple
 import base64
-import io
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 
 KEY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.private-key.json')
 
+ee = None
+service_account = None
+
 _initialized = False
+_init_lock = threading.Lock()
+
+MOSAIC_WINDOW_DAYS = 30
+
+_overlay_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gee-overlay")
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+_romania_geom = None
+_romania_lock = threading.Lock()
+
+ANALYSIS_CACHE_SIZE = 128
+_analysis_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+_inflight: Dict[str, asyncio.Future] = {}
+
+def _lazy_imports():
+    global ee, service_account
+    if ee is None:
+        import ee as _ee
+        from google.oauth2 import service_account as _service_account
+        service_account = _service_account
+        ee = _ee
 
 def init_gee():
     global _initialized
     if _initialized:
         return True
+    
+    with _init_lock:
+        if _initialized:
+            return True
         
-    try:
-        if not os.path.exists(KEY_PATH):
-            print(f"❌ Key file missing at {KEY_PATH}")
+        try:
+            _lazy_imports()
+            
+            if not os.path.exists(KEY_PATH):
+                print(f"❌ Key file missing at {KEY_PATH}")
+                return False
+            
+            credentials = service_account.Credentials.from_service_account_file(
+                KEY_PATH,
+                scopes=['https://www.googleapis.com/auth/earthengine']
+            )
+            ee.Initialize(credentials)
+            print("✅ Earth Engine Initialized.")
+            _initialized = True
+            return True
+        except Exception as e:
+            print(f"❌ Earth Engine Init Error: {e}")
             return False
-        
-        credentials = service_account.Credentials.from_service_account_file(
-            KEY_PATH,
-            scopes=['https://www.googleapis.com/auth/earthengine']
-        )
-        ee.Initialize(credentials)
-        print("✅ Earth Engine Initialized.")
-        _initialized = True
-        return True
+
+def get_romania_geometry():
+    global _romania_geom
+    if _romania_geom is None:
+        with _romania_lock:
+            if _romania_geom is None:
+                _romania_geom = ee.FeatureCollection("FAO/GAUL/2015/level0") \
+                    .filter(ee.Filter.eq('ADM0_NAME', 'Romania')) \
+                    .geometry()
+    return _romania_geom
+
+def analysis_cache_key(farm_geojson: Dict, before_date: str, after_date: str) -> str:
+    geojson_hash = hashlib.blake2b(
+        json.dumps(farm_geojson, sort_keys=True).encode(),
+        digest_size=16
+    ).hexdigest()
+    return f"{geojson_hash}:{before_date}:{after_date}:{date.today().isoformat()}"
+
+def get_mosaic(farm_geom, date_str: str, window_days: int = 30):
+    end_date = ee.Date(date_str).advance(window_days, 'day')
+    collection = (ee.ImageCollection("COPERNICUS/S1_GRD")
+            .filterBounds(farm_geom)
+            .filterDate(date_str, end_date)
+            .filter(ee.Filter.listContains('transmitterReceiverPolarisation', 'VV'))
+            .filter(ee.Filter.eq('instrumentMode', 'IW'))
+            .select('VV'))
+    
+    return collection, collection.mosaic().clip(farm_geom)
+
+def convert_coordinates(coords):
+    if isinstance(coords, dict) and 'lat' in coords and 'lng' in coords:
+        return [coords['lng'], coords['lat']]
+    elif isinstance(coords, list):
+        return [convert_coordinates(c) for c in coords]
+    return coords
+
+def to_lng_lat(coords):
+    try:
+        if isinstance(coords[0][0], dict):
+            return [[[p['lng'], p['lat']] for p in ring] for ring in coords]
+        if isinstance(coords[0][0][0], dict):
+            return [[[[p['lng'], p['lat']] for p in ring] for ring in polygon] for polygon in coords]
+    except (TypeError, KeyError, IndexError):
+        pass
+    return convert_coordinates(coords)
+
+def fetch_overlay(change_mask, farm_geom, abandoned: Optional[threading.Event] = None) -> Tuple[str, Optional[str]]:
+    tile_url = change_mask.visualize(palette=['FF0000']).getThumbURL({
+        'region': farm_geom,
+        'format': 'png',
+        'dimensions': 512
+    })
+    
+    if abandoned is not None and abandoned.is_set():
+        print("🛑 Overlay no longer needed, skipping download")
+        return tile_url, None
+    
+    print(f"🖼️  Tile URL: {tile_url}")
+    
+    overlay_b64 = None
+    try:
+        response = _session.get(tile_url, timeout=30)
+        if response.status_code == 200:
+            overlay_b64 = base64.b64encode(response.content).decode('ascii')
+            print(f"✅ Overlay image fetched: {len(overlay_b64)} chars")
+        else:
+            print(f"❌ Failed to fetch overlay: HTTP {response.status_code}")
     except Exception as e:
-        print(f"❌ Earth Engine Init Error: {e}")
-        return False
+        print(f"❌ Failed to fetch overlay image: {e}")
+    
+    return tile_url, overlay_b64
+
+def _report_discarded_overlay(overlay_future) -> None:
+    if overlay_future.cancelled():
+        return
+    error = overlay_future.exception()
+    if error is not None:
+        print(f"⚠️  Discarded overlay fetch failed: {error}")
+
+def discard_overlay(overlay_future, abandoned: threading.Event) -> None:
+    abandoned.set()
+    if not overlay_future.cancel():
+        overlay_future.add_done_callback(_report_discarded_overlay)
 
 def analyze_farm(farm_geojson: Dict, before_date: str, after_date: str) -> Dict:
+    key = analysis_cache_key(farm_geojson, before_date, after_date)
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(key)
+        if cached is not None:
+            _analysis_cache.move_to_end(key)
+            return dict(cached)
+    
+    result = _analyze_farm(farm_geojson, before_date, after_date)
+    
+    if 'error' not in result and result.get('overlay_b64'):
+        with _analysis_cache_lock:
+            _analysis_cache[key] = dict(result)
+            if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+                _analysis_cache.popitem(last=False)
+    return result
+
+async def analyze_farm_async(farm_geojson: Dict, before_date: str, after_date: str) -> Dict:
+    key = analysis_cache_key(farm_geojson, before_date, after_date)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(analyze_farm, farm_geojson, before_date, after_date))
+        _inflight[key] = task
+        task.add_done_callback(lambda done, key=key: _forget_inflight(key, done))
+    return dict(await asyncio.shield(task))
+
+def _forget_inflight(key: str, task: asyncio.Future) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()
+
+def _analyze_farm(farm_geojson: Dict, before_date: str, after_date: str) -> Dict:
     if not init_gee():
         raise Exception("Google Earth Engine initialization failed")
     
-    def convert_coordinates(coords):
-        if isinstance(coords, dict) and 'lat' in coords and 'lng' in coords:
-            return [coords['lng'], coords['lat']]
-        elif isinstance(coords, list):
-            return [convert_coordinates(c) for c in coords]
-        return coords
-    
     if isinstance(farm_geojson, dict):
         if farm_geojson.get('type') == 'FeatureCollection' and 'features' in farm_geojson:
             geom = ee.FeatureCollection(farm_geojson).geometry()
         elif farm_geojson.get('type') == 'Feature':
             geometry_part = farm_geojson['geometry']
-            converted_coords = convert_coordinates(geometry_part.get('coordinates'))
+            converted_coords = to_lng_lat(geometry_part.get('coordinates'))
             geometry_converted = {
                 'type': geometry_part['type'],
                 'coordinates': converted_coords
@@ -60,37 +211,60 @@ def analyze_farm(farm_geojson: Dict, before_date: str, after_date: str) -> Dict:
     else:
         raise ValueError("Invalid GeoJSON input")
 
-    romania = ee.FeatureCollection("FAO/GAUL/2015/level0") \
-        .filter(ee.Filter.eq('ADM0_NAME', 'Romania')) \
-        .geometry()
-    
-    farm_geom = geom.intersection(romania, ee.ErrorMargin(1))
-    
-    def get_mosaic(date_str):
-        end_date = ee.Date(date_str).advance(30, 'day')
-        collection = (ee.ImageCollection("COPERNICUS/S1_GRD")
-                .filterBounds(farm_geom)
-                .filterDate(date_str, end_date)
-                .filter(ee.Filter.listContains('transmitterReceiverPolarisation', 'VV'))
-                .filter(ee.Filter.eq('instrumentMode', 'IW'))
-                .select('VV'))
-        
-        count = collection.size().getInfo()
-        print(f"📡 Found {count} Sentinel-1 images for {date_str} (+30 days)")
-        
-        return collection.mosaic().clip(farm_geom)
-
-    before = get_mosaic(before_date)
-    after = get_mosaic(after_date)
+    farm_geom = geom.intersection(get_romania_geometry(), ee.ErrorMargin(1))
     
-    before_band_count = before.bandNames().size().getInfo()
-    after_band_count = after.bandNames().size().getInfo()
+    before_collection, before = get_mosaic(farm_geom, before_date, MOSAIC_WINDOW_DAYS)
+    after_collection, after = get_mosaic(farm_geom, after_date, MOSAIC_WINDOW_DAYS)
     
+    before_bands = before.bandNames().size()
+    after_bands = after.bandNames().size()
+    has_bands = before_bands.gt(0).And(after_bands.gt(0))
+    
+    ratio = after.divide(before)
+    change_mask = ratio.gt(1.3).selfMask()
+    
+    overlay_abandoned = threading.Event()
+    overlay_future = _overlay_executor.submit(fetch_overlay, change_mask, farm_geom, overlay_abandoned)
+    
+    pixel_area = ee.Image.pixelArea()
+    
+    stats_img = ee.Image.cat(
+        pixel_area.updateMask(change_mask).rename('d'),
+        pixel_area.rename('t')
+    ).clip(farm_geom)
+    
+    stats = stats_img.reduceRegion(
+        reducer=ee.Reducer.sum(),
+        geometry=farm_geom,
+        scale=10,
+        maxPixels=1e9,
+        tileScale=4,
+        bestEffort=True
+    )
+    
+    try:
+        info = ee.Dictionary({
+            'before_count': before_collection.size(),
+            'after_count': after_collection.size(),
+            'before_bands': before_bands,
+            'after_bands': after_bands,
+            'd_area': ee.Algorithms.If(has_bands, stats.get('d'), 0),
+            't_area': ee.Algorithms.If(has_bands, stats.get('t'), 0)
+        }).getInfo()
+    except BaseException:
+        discard_overlay(overlay_future, overlay_abandoned)
+        raise
+    
+    before_band_count = info['before_bands']
+    after_band_count = info['after_bands']
+    
+    print(f"📡 Found {info['before_count']} Sentinel-1 images for {before_date} and {info['after_count']} for {after_date} (+{MOSAIC_WINDOW_DAYS} days)")
     print(f"🔍 Before bands: {before_band_count}, After bands: {after_band_count}")
     
     if before_band_count == 0 or after_band_count == 0:
         error_msg = f"No Sentinel-1 images found for the specified date range. Before: {before_band_count} bands, After: {after_band_count} bands"
         print(f"❌ {error_msg}")
+        discard_overlay(overlay_future, overlay_abandoned)
         return {
             "damage_percent": 0.0,
             "damaged_area_ha": 0.0,
@@ -99,27 +273,8 @@ def analyze_farm(farm_geojson: Dict, before_date: str, after_date: str) -> Dict:
             "error": error_msg
         }
     
-    ratio = after.divide(before)
-    change_mask = ratio.gt(1.3).selfMask()
-    
-    pixel_area = ee.Image.pixelArea()
-    
-    d_stats = pixel_area.updateMask(change_mask).reduceRegion(
-        reducer=ee.Reducer.sum(),
-        geometry=farm_geom,
-        scale=10,
-        maxPixels=1e9
-    )
-    
-    t_stats = pixel_area.clip(farm_geom).reduceRegion(
-        reducer=ee.Reducer.sum(),
-        geometry=farm_geom,
-        scale=10,
-        maxPixels=1e9
-    )
-    
-    d_m2 = d_stats.get('area').getInfo() or 0.0
-    t_m2 = t_stats.get('area').getInfo() or 0.0
+    d_m2 = info.get('d_area') or 0.0
+    t_m2 = info.get('t_area') or 0.0
     
     d_ha = d_m2 / 10000.0
     t_ha = t_m2 / 10000.0
@@ -128,24 +283,7 @@ def analyze_farm(farm_geojson: Dict, before_date: str, after_date: str) -> Dict:
     
     print(f"📊 Analysis Results: Damaged={d_ha:.2f}ha, Total={t_ha:.2f}ha, Percent={pct:.2f}%")
     
-    tile_url = change_mask.visualize(palette=['FF0000']).getThumbURL({
-        'region': farm_geom,
-        'format': 'png',
-        'dimensions': 512
-    })
-    
-    print(f"🖼️  Tile URL: {tile_url}")
-    
-    overlay_b64 = None
-    try:
-        response = requests.get(tile_url, timeout=30)
-        if response.status_code == 200:
-            overlay_b64 = base64.b64encode(response.content).decode()
-            print(f"✅ Overlay image fetched: {len(overlay_b64)} chars")
-        else:
-            print(f"❌ Failed to fetch overlay: HTTP {response.status_code}")
-    except Exception as e:
-        print(f"❌ Failed to fetch overlay image: {e}")
+    tile_url, overlay_b64 = overlay_future.result()
     
     result = {
         "damageAreaHa": round(d_ha, 2),
@@ -174,8 +312,10 @@ async def analyze_property_gee_comparison(
     print(f"📅 Before Period: {before_date} to {incident_date} (30 days before)")
     print(f"📅 After Period: {incident_date} to {after_date} (30 days after)")
     
-    result_before = analyze_farm(geometry, before_date, incident_date)
-    result_after = analyze_farm(geometry, incident_date, after_date)
+    result_before, result_after = await asyncio.gather(
+        analyze_farm_async(geometry, before_date, incident_date),
+        analyze_farm_async(geometry, incident_date, after_date)
+    )
     
     if 'error' in result_before and 'error' in result_after:
         return {
@@ -238,7 +378,7 @@ async def analyze_property_gee(
     post_date: str,
     cost_per_ha: float = 5000
 ) -> Dict:
-    result = analyze_farm(geometry, pre_date, post_date)
+    result = await analyze_farm_async(geometry, pre_date, post_date)
     
     if 'error' in result:
         return {
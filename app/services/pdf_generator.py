@@ -1,67 +1,117 @@
 import io
-import base64
+import binascii
+import logging
 from datetime import datetime
 from fpdf import FPDF
-from typing import Dict, Optional
-import requests
+from typing import Dict, Optional, Union
 from PIL import Image
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_overlay_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-overlay")
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_COLOR_TYPE_RGBA = 6
+
+def prepare_overlay(overlay_b64: Union[str, bytes]) -> io.BytesIO:
+    raw = binascii.a2b_base64(overlay_b64)
+    if raw[:8] == PNG_SIGNATURE and len(raw) > 25 and raw[25] != PNG_COLOR_TYPE_RGBA:
+        logger.debug("Overlay is a non-RGBA PNG, embedding %d bytes as-is", len(raw))
+        return io.BytesIO(raw)
+    
+    overlay_image = Image.open(io.BytesIO(raw))
+    overlay_image.load()
+    logger.debug("Overlay image size: %s, mode: %s", overlay_image.size, overlay_image.mode)
+    if overlay_image.mode == 'RGBA':
+        alpha_levels = overlay_image.getchannel('A').getcolors(256)
+        if alpha_levels is not None and len(alpha_levels) <= 2:
+            overlay_image = overlay_image.quantize(colors=64, method=Image.Quantize.FASTOCTREE)
+    
+    image_buffer = io.BytesIO()
+    overlay_image.save(image_buffer, 'PNG', compress_level=1)
+    image_buffer.seek(0)
+    logger.debug("Overlay image encoded: %d bytes", image_buffer.getbuffer().nbytes)
+    return image_buffer
+
+_ROMANIAN_TABLE = str.maketrans({
+    'ă': 'a', 'Ă': 'A',
+    'â': 'a', 'Â': 'A',
+    'î': 'i', 'Î': 'I',
+    'ș': 's', 'Ș': 'S',
+    'ț': 't', 'Ț': 'T'
+})
 
 def normalize_romanian_text(text: str) -> str:
     """Replace Romanian special characters with ASCII equivalents for PDF compatibility."""
-    replacements = {
-        'ă': 'a', 'Ă': 'A',
-        'â': 'a', 'Â': 'A',
-        'î': 'i', 'Î': 'I',
-        'ș': 's', 'Ș': 'S',
-        'ț': 't', 'Ț': 'T'
-    }
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    return text
+    return text.translate(_ROMANIAN_TABLE)
+
+_MARKDOWN_RE = re.compile(r'(?P<h3>### )|(?P<h2>## )|(?P<h1># )|(?P<bullet>[-*] )|(?P<bold>\*\*)')
+
+def flush_paragraph(pdf: FPDF, paragraph: list):
+    if not paragraph:
+        return
+    if pdf.get_y() > 250:
+        pdf.add_page()
+    pdf.set_font('Times', '', 9)
+    pdf.set_x(10)
+    pdf.multi_cell(0, 5, '\n'.join(paragraph))
+    paragraph.clear()
 
 def parse_markdown_to_pdf(pdf: FPDF, text: str):
     """Parse simple markdown and add to PDF."""
     text = normalize_romanian_text(text)
     lines = text.split('\n')
+    paragraph = []
     
     for line in lines:
         line = line.strip()
         if not line:
+            flush_paragraph(pdf, paragraph)
             pdf.ln(3)
             continue
         
+        match = _MARKDOWN_RE.match(line)
+        kind = match.lastgroup if match else None
+        if kind == 'bold' and not line.endswith('**'):
+            kind = None
+        
+        if kind is None:
+            paragraph.append(line)
+            continue
+        
+        flush_paragraph(pdf, paragraph)
+        
         if pdf.get_y() > 250:
             pdf.add_page()
         
-        if line.startswith('### '):
+        if kind == 'h3':
             pdf.set_font('Times', 'B', 11)
             pdf.set_x(10)
             pdf.multi_cell(0, 6, line[4:])
             pdf.ln(2)
-        elif line.startswith('## '):
+        elif kind == 'h2':
             pdf.set_font('Times', 'B', 12)
             pdf.set_x(10)
             pdf.multi_cell(0, 7, line[3:])
             pdf.ln(3)
-        elif line.startswith('# '):
+        elif kind == 'h1':
             pdf.set_font('Times', 'B', 13)
             pdf.set_x(10)
             pdf.multi_cell(0, 8, line[2:])
             pdf.ln(3)
-        elif line.startswith('- ') or line.startswith('* '):
+        elif kind == 'bullet':
             pdf.set_font('Times', '', 9)
             pdf.set_x(10)
             pdf.cell(10, 5, '  •', 0, 0)
             pdf.multi_cell(0, 5, line[2:])
-        elif line.startswith('**') and line.endswith('**'):
+        else:
             pdf.set_font('Times', 'B', 9)
             pdf.set_x(10)
             pdf.multi_cell(0, 5, line[2:-2])
-        else:
-            pdf.set_font('Times', '', 9)
-            pdf.set_x(10)
-            pdf.multi_cell(0, 5, line)
+    
+    flush_paragraph(pdf, paragraph)
 
 class ReportPDF(FPDF):
     def header(self):
@@ -95,14 +145,38 @@ class ReportPDF(FPDF):
             self.set_font('Times', '', 10)
         self.cell(0, 6, normalize_romanian_text(value), 0, 1)
 
+_CONCLUSION_TEMPLATE = normalize_romanian_text("""Acest raport a fost generat automat folosind tehnologia de analiza satelitara SpotyFire, 
+bazata pe imagini Sentinel-1 SAR (Synthetic Aperture Radar) de la Agentia Spatiala Europeana.
+
+Analiza comparativa a fost realizata pe doua perioade distincte:
+- Perioada pre-incident: de la {before_date} pana la {incident_date}
+- Perioada post-incident: de la {incident_date} pana la {after_date} (prezent)
+
+Conform datelor satelitare, s-a identificat o deteriorare de {damage_percent:.2f}% din suprafata totala, 
+reprezentand {damaged_area_ha:.2f} hectare afectate dintr-un total de 
+{total_area_ha:.2f} hectare.
+
+Costul estimat al daunelor este de {estimated_cost:,.0f} RON, calculat pe baza 
+valorii declarate a culturii de {crop_type}.
+
+Acest document serveste drept suport tehnic pentru dosarul de asigurare si poate fi utilizat ca dovada 
+obiectiva a daunelor suferite.""")
+
+_NOTA_TEXT = normalize_romanian_text("""Nota: Acest raport este generat automat pe baza analizei satelitare si are caracter informativ. 
+Pentru evaluarea finala a daunelor si stabilirea despagubirii, va rugam sa contactati compania de asigurari 
+si sa urmati procedurile standard de evaluare la fata locului.""")
+
 def generate_satellite_report_pdf(
     property_name: str,
     analysis_data: Dict,
     property_data: Dict,
-    overlay_before_b64: Optional[str] = None,
-    overlay_after_b64: Optional[str] = None,
+    overlay_before_b64: Optional[Union[str, bytes]] = None,
+    overlay_after_b64: Optional[Union[str, bytes]] = None,
     ai_insights: Optional[str] = None
 ) -> bytes:
+    before_future = _overlay_executor.submit(prepare_overlay, overlay_before_b64) if overlay_before_b64 else None
+    after_future = _overlay_executor.submit(prepare_overlay, overlay_after_b64) if overlay_after_b64 else None
+    
     pdf = ReportPDF()
     pdf.add_page()
     
@@ -135,8 +209,8 @@ def generate_satellite_report_pdf(
     
     pdf.ln(10)
     
-    print(f"DEBUG: overlay_before_b64 length: {len(overlay_before_b64) if overlay_before_b64 else 0}")
-    print(f"DEBUG: overlay_after_b64 length: {len(overlay_after_b64) if overlay_after_b64 else 0}")
+    logger.debug("overlay_before_b64 length: %d", len(overlay_before_b64) if overlay_before_b64 else 0)
+    logger.debug("overlay_after_b64 length: %d", len(overlay_after_b64) if overlay_after_b64 else 0)
     
     if overlay_before_b64:
         try:
@@ -156,22 +230,14 @@ def generate_satellite_report_pdf(
             pdf.section_text('Suprafata Totala:', f'{analysis_data.get("total_area_ha", 0):.2f} ha')
             pdf.ln(10)
             
-            print(f"DEBUG: Processing before overlay")
-            overlay_data = base64.b64decode(overlay_before_b64)
-            overlay_image = Image.open(io.BytesIO(overlay_data))
-            print(f"DEBUG: Before overlay image size: {overlay_image.size}, mode: {overlay_image.mode}")
-            
-            temp_path = f'/tmp/before_{datetime.now().timestamp()}.png'
-            overlay_image.save(temp_path, 'PNG')
-            print(f"DEBUG: Before image saved to {temp_path}")
+            logger.debug("Processing before overlay")
+            image_buffer = before_future.result()
             
-            pdf.image(temp_path, x=10, y=pdf.get_y(), w=190)
-            print(f"DEBUG: Before image added to PDF")
+            pdf.image(image_buffer, x=10, y=pdf.get_y(), w=190)
+            logger.debug("Before image added to PDF")
             
         except Exception as e:
-            print(f"DEBUG: Exception in before image processing: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Failed to add before image to PDF: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
     
     if overlay_after_b64:
         try:
@@ -193,23 +259,14 @@ def generate_satellite_report_pdf(
                 pdf.section_text('NDVI Mediu:', f'{analysis_data.get("ndvi_after"):.3f}')
             pdf.ln(10)
             
-            print(f"DEBUG: Processing after overlay")
-            overlay_data = base64.b64decode(overlay_after_b64)
-            overlay_image = Image.open(io.BytesIO(overlay_data))
-            print(f"DEBUG: After overlay image size: {overlay_image.size}, mode: {overlay_image.mode}")
+            logger.debug("Processing after overlay")
+            image_buffer = after_future.result()
             
-            temp_path = f'/tmp/after_{datetime.now().timestamp()}.png'
-            overlay_image.save(temp_path, 'PNG')
-            print(f"DEBUG: After image saved to {temp_path}")
-            
-            pdf.image(temp_path, x=10, y=pdf.get_y(), w=190)
-            print(f"DEBUG: After image added to PDF")
+            pdf.image(image_buffer, x=10, y=pdf.get_y(), w=190)
+            logger.debug("After image added to PDF")
             
         except Exception as e:
-            print(f"DEBUG: Exception in after image processing: {e}")
-            import traceback
-            traceback.print_exc()
-            print(f"Failed to add satellite images to PDF: {e}")
+            logger.warning("Failed to add after image to PDF: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
     
     if ai_insights:
         pdf.add_page()
@@ -221,30 +278,22 @@ def generate_satellite_report_pdf(
     pdf.chapter_title('CONCLUZII SI RECOMANDARI')
     
     pdf.set_font('Times', '', 9)
-    conclusion = f"""Acest raport a fost generat automat folosind tehnologia de analiza satelitara SpotyFire, 
-bazata pe imagini Sentinel-1 SAR (Synthetic Aperture Radar) de la Agentia Spatiala Europeana.
-
-Analiza comparativa a fost realizata pe doua perioade distincte:
-- Perioada pre-incident: de la {analysis_data.get('before_date')} pana la {analysis_data.get('incident_date')}
-- Perioada post-incident: de la {analysis_data.get('incident_date')} pana la {analysis_data.get('after_date')} (prezent)
-
-Conform datelor satelitare, s-a identificat o deteriorare de {damage_percent:.2f}% din suprafata totala, 
-reprezentand {analysis_data.get("damaged_area_ha", 0):.2f} hectare afectate dintr-un total de 
-{analysis_data.get("total_area_ha", 0):.2f} hectare.
-
-Costul estimat al daunelor este de {analysis_data.get("estimated_cost", 0):,.0f} RON, calculat pe baza 
-valorii declarate a culturii de {property_data.get('crop_type', 'N/A')}.
-
-Acest document serveste drept suport tehnic pentru dosarul de asigurare si poate fi utilizat ca dovada 
-obiectiva a daunelor suferite."""
+    conclusion = _CONCLUSION_TEMPLATE.format(
+        before_date=analysis_data.get('before_date'),
+        incident_date=analysis_data.get('incident_date'),
+        after_date=analysis_data.get('after_date'),
+        damage_percent=damage_percent,
+        damaged_area_ha=analysis_data.get("damaged_area_ha", 0),
+        total_area_ha=analysis_data.get("total_area_ha", 0),
+        estimated_cost=analysis_data.get("estimated_cost", 0),
+        crop_type=normalize_romanian_text(str(property_data.get('crop_type', 'N/A')))
+    )
     
-    pdf.multi_cell(0, 5, normalize_romanian_text(conclusion))
+    pdf.multi_cell(0, 5, conclusion)
     pdf.ln(8)
     
     pdf.set_font('Times', 'I', 8)
     pdf.set_text_color(100, 100, 100)
-    pdf.multi_cell(0, 4, normalize_romanian_text("""Nota: Acest raport este generat automat pe baza analizei satelitare si are caracter informativ. 
-Pentru evaluarea finala a daunelor si stabilirea despagubirii, va rugam sa contactati compania de asigurari 
-si sa urmati procedurile standard de evaluare la fata locului."""))
+    pdf.multi_cell(0, 4, _NOTA_TEXT)
     
     return bytes(pdf.output())